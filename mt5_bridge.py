@@ -6,14 +6,21 @@ NO MQL5 REQUIRED - Direct Python MetaTrader5 API integration
 """
 
 import asyncio
+import functools
 import websockets
-import json
+from websockets import broadcast
+import orjson
 import logging
+import math
 import MetaTrader5 as mt5
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from numba import njit
+from datetime import timedelta
 import threading
 import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 import os
 from dotenv import load_dotenv
@@ -32,24 +39,113 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# MT5 trade constants rebound as module globals for the order path
+_DEAL = mt5.TRADE_ACTION_DEAL
+_BUY = mt5.ORDER_TYPE_BUY
+_SELL = mt5.ORDER_TYPE_SELL
+_GTC = mt5.ORDER_TIME_GTC
+_IOC = mt5.ORDER_FILLING_IOC
+_DONE = mt5.TRADE_RETCODE_DONE
+
+# Clients with more unsent bytes than this are skipped until they catch up
+CLIENT_WRITE_BUFFER_LIMIT = 64 * 1024
+
+# Subprotocol under which every server frame is a zlib-compressed binary message;
+# compression happens once per payload instead of per-connection permessage-deflate
+ZLIB_SUBPROTOCOL = 'aria-zlib-1'
+
+# Per-connection token bucket for inbound client messages
+CLIENT_MESSAGE_RATE = 10.0   # tokens refilled per second
+CLIENT_MESSAGE_BURST = 20.0  # bucket capacity
+
+# Seconds an account snapshot (and the handshake built from it) stays valid
+ACCOUNT_CACHE_TTL = 1.0
+
+# Characters with special meaning in an mt5.symbols_get() group filter
+_GROUP_SYNTAX = frozenset('*!,')
+
+# Column order of the packed price matrix sent in market_data_batch
+PRICE_FIELDS = ('bid', 'ask', 'spread')
+
+# market_data_batch frame with every constant fragment pre-encoded; only the
+# timestamp, symbol list and price matrix are substituted per tick
+_BATCH_TEMPLATE = (
+    b'{"type":"market_data_batch","timestamp":%d,"symbols":%b,"fields":'
+    + orjson.dumps(PRICE_FIELDS)
+    + b',"prices":%b}'
+)
+
+def poll_period_from_env(value: str) -> float:
+    """Convert an MT5_POLL_HZ value to seconds per tick, falling back to 1 Hz"""
+    try:
+        hz = float(value)
+    except ValueError:
+        hz = 0.0
+    if not math.isfinite(hz) or hz <= 0:
+        logger.error(f"Invalid MT5_POLL_HZ={value!r} - must be a positive number, falling back to 1 Hz")
+        return 1.0
+    return 1.0 / hz
+
+@njit(cache=True)
+def pack_ticks(bids, asks, spreads, digits):
+    """Pack raw quotes into an n x 3 matrix of bid, ask and spread in price units"""
+    n = bids.shape[0]
+    packed = np.empty((n, 3), dtype=np.float64)
+    for i in range(n):
+        d = digits[i]
+        packed[i, 0] = round(bids[i], d)
+        packed[i, 1] = round(asks[i], d)
+        packed[i, 2] = round(spreads[i] * 10.0 ** -d, d)
+    return packed
+
 class MT5Bridge:
     def __init__(self):
-        self.connected_clients = set()
+        # List for cheap per-tick iteration; id(ws) -> list position makes
+        # membership checks and swap-removal O(1)
+        self.connected_clients = []
+        self._client_index = {}
         self.mt5_connected = False
         self.subscribed_symbols = set()
+        # Immutable views rebuilt on (un)subscribe; the price worker only reads these
+        self._symbols_snapshot = ()
+        self._symbol_group = ''
+        # Last symbol list seen from MT5 and its JSON encoding
+        self._symbols_json = ([], b'[]')
         self.price_thread = None
+        # The MetaTrader5 package is not thread-safe: every MT5 call runs on
+        # this single worker thread, which owns the one MT5 session
+        self._mt5_executor = ThreadPoolExecutor(max_workers=1)
+        # (monotonic time, account dict) plus the 'connected' frame built from it
+        self._account_cache = (float('-inf'), {})
+        self._connected_bytes = b''
+        # Held while refreshing so concurrent callers share one MT5 round-trip
+        self._account_lock = asyncio.Lock()
         self.running = False
+        # Set while there is at least one client and one subscribed symbol
+        self._has_work = asyncio.Event()
         
         # MT5 Configuration
         self.mt5_login = int(os.getenv('MT5_LOGIN', '103936248'))
         self.mt5_password = os.getenv('MT5_PASSWORD', '>Lyl2E_/')
         self.mt5_server = os.getenv('MT5_SERVER', 'FBS-Demo')
         self.websocket_port = int(os.getenv('MT5_WEBSOCKET_PORT', '8000'))
+        self._tick_period = poll_period_from_env(os.getenv('MT5_POLL_HZ', '1'))
+        self.max_clients = int(os.getenv('MT5_MAX_CLIENTS', '100'))
         
         logger.info(f"MT5 Bridge initialized - Server: {self.mt5_server}, Login: {self.mt5_login}")
 
+    async def _mt5_call(self, func, *args, **kwargs):
+        """Run a blocking MT5 call on the executor thread that owns the session"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._mt5_executor, functools.partial(func, *args, **kwargs)
+        )
+
     async def initialize_mt5(self) -> bool:
         """Initialize MT5 connection"""
+        return await self._mt5_call(self._initialize_mt5)
+
+    def _initialize_mt5(self) -> bool:
+        """Initialize and log in to MT5; runs on the MT5 executor"""
         try:
             # Initialize MT5
             if not mt5.initialize():
@@ -98,124 +194,182 @@ class MT5Bridge:
             logger.error(f"Error getting symbol info for {symbol}: {e}")
             return None
 
-    def get_current_prices(self, symbols: List[str]) -> List[Dict]:
-        """Get current prices for symbols"""
-        prices = []
-        for symbol in symbols:
-            symbol_info = self.get_symbol_info(symbol)
-            if symbol_info:
-                prices.append({
-                    'type': 'price',
-                    'data': symbol_info
-                })
-        return prices
+    def _snapshot(self, group: str) -> tuple:
+        """Poll MT5 for every symbol in the group as (names, bids, asks, spreads, digits)"""
+        symbols = mt5.symbols_get(group=group)
+        if symbols is None:
+            logger.error(f"MT5 symbols_get() failed: {mt5.last_error()}")
+            symbols = ()
+        n = len(symbols)
+        return (
+            [info.name for info in symbols],
+            np.fromiter((info.bid for info in symbols), dtype=np.float64, count=n),
+            np.fromiter((info.ask for info in symbols), dtype=np.float64, count=n),
+            np.fromiter((info.spread for info in symbols), dtype=np.float64, count=n),
+            np.fromiter((info.digits for info in symbols), dtype=np.int64, count=n)
+        )
 
     async def price_feed_worker(self):
         """Background worker for price updates"""
-        logger.info("Starting price feed worker")
+        logger.info(f"Starting price feed worker at {1.0 / self._tick_period:g} Hz")
         
+        deadline = time.monotonic()
         while self.running and self.mt5_connected:
+            if not self._has_work.is_set():
+                # Idle until a client is connected and subscribed to something
+                await self._has_work.wait()
+                deadline = time.monotonic()
+            
             try:
-                if self.subscribed_symbols and self.connected_clients:
-                    prices = self.get_current_prices(list(self.subscribed_symbols))
+                symbol_group = self._symbol_group
+                if self._symbols_snapshot and self.connected_clients:
+                    # Milliseconds since epoch, taken once for the whole tick
+                    timestamp = time.time_ns() // 1_000_000
                     
-                    for price_data in prices:
-                        # Format data for frontend compatibility
-                        formatted_data = {
-                            'type': 'market_data',
-                            'symbol': price_data['data']['symbol'],
-                            'timestamp': datetime.now().isoformat(),
-                            'open': price_data['data']['bid'],
-                            'high': price_data['data']['ask'],
-                            'low': price_data['data']['bid'],
-                            'close': price_data['data']['bid'],
-                            'volume': 1000,
-                            'bid': price_data['data']['bid'],
-                            'ask': price_data['data']['ask'],
-                            'bidSize': 1000,
-                            'askSize': 1000,
-                            'change24h': 0.0,
-                            'changePercent24h': 0.0
-                        }
+                    # Poll MT5 off the event loop so sockets keep draining
+                    names, bids, asks, spreads, digits = await self._mt5_call(self._snapshot, symbol_group)
+                    
+                    if names:
+                        prices = pack_ticks(bids, asks, spreads, digits)
+                        if logger.isEnabledFor(logging.DEBUG):
+                            for symbol, (bid, ask, _) in zip(names, prices):
+                                logger.debug(f"Sending price data for {symbol}: bid={bid}, ask={ask}")
                         
-                        message = json.dumps(formatted_data)
-                        logger.info(f"Sending price data for {formatted_data['symbol']}: bid={formatted_data['bid']}, ask={formatted_data['ask']}")
+                        message = self._encode_batch(timestamp, names, prices)
                         
-                        # Send to all connected clients
-                        disconnected_clients = set()
-                        for client in self.connected_clients.copy():
-                            try:
-                                await client.send(message)
-                            except websockets.exceptions.ConnectionClosed:
-                                disconnected_clients.add(client)
-                            except Exception as e:
-                                logger.error(f"Error sending price data: {e}")
-                                disconnected_clients.add(client)
+                        # Non-awaiting write of the same bytes object to every open
+                        # connection (sent as a binary frame, so no per-client UTF-8
+                        # encode); slow clients are skipped rather than buffered without bound
+                        plain_clients = []
+                        zlib_clients = []
+                        for client in self.connected_clients:
+                            if client.transport.get_write_buffer_size() > CLIENT_WRITE_BUFFER_LIMIT:
+                                continue
+                            if client.subprotocol == ZLIB_SUBPROTOCOL:
+                                zlib_clients.append(client)
+                            else:
+                                plain_clients.append(client)
                         
-                        # Remove disconnected clients
-                        self.connected_clients -= disconnected_clients
-                
-                await asyncio.sleep(1.0)  # Update every 1 second
+                        broadcast(plain_clients, message)
+                        if zlib_clients:
+                            # Compressed once and shared by every zlib client
+                            broadcast(zlib_clients, zlib.compress(message, 1))
                 
             except Exception as e:
                 logger.error(f"Price feed worker error: {e}")
-                await asyncio.sleep(1)
+            
+            # Fixed-rate schedule so poll and send time do not stretch the period;
+            # after a stall, skip the missed ticks instead of bursting to catch up
+            deadline += self._tick_period
+            now = time.monotonic()
+            if deadline < now:
+                deadline = now
+            await asyncio.sleep(deadline - now)
+
+    def _encode_batch(self, timestamp: int, names: List[str], prices: np.ndarray) -> bytes:
+        """Encode one market_data_batch frame; row i of prices holds PRICE_FIELDS for names[i]"""
+        cached_names, symbols_json = self._symbols_json
+        if names != cached_names:
+            symbols_json = orjson.dumps(names)
+            self._symbols_json = (names, symbols_json)
+        
+        return _BATCH_TEMPLATE % (
+            timestamp,
+            symbols_json,
+            orjson.dumps(prices, option=orjson.OPT_SERIALIZE_NUMPY)
+        )
+
+    @staticmethod
+    def _valid_symbol(symbol) -> bool:
+        """Accept only plain symbol names, never symbols_get() group syntax"""
+        return isinstance(symbol, str) and bool(symbol) and _GROUP_SYNTAX.isdisjoint(symbol)
+
+    def _refresh_symbols(self):
+        """Rebuild the symbol snapshot and symbols_get() group filter after a subscription change"""
+        self._symbols_snapshot = tuple(sorted(self.subscribed_symbols))
+        self._symbol_group = ','.join(self._symbols_snapshot)
+        self._update_has_work()
+
+    def _update_has_work(self):
+        """Wake or idle the price worker depending on clients and subscriptions"""
+        if self.connected_clients and self._symbols_snapshot:
+            self._has_work.set()
+        else:
+            self._has_work.clear()
 
     async def handle_client_message(self, websocket, message: str):
-        """Handle incoming client messages"""
+        """Handle incoming client messages
+
+        Actions: subscribe, unsubscribe, trade, close, account_info.
+        Price updates for subscribed symbols are pushed once per tick as a
+        single 'market_data_batch' message: 'symbols' names each row of the
+        'prices' matrix, whose columns are given by 'fields'.
+        """
         try:
-            data = json.loads(message)
+            data = orjson.loads(message)
             action = data.get('action')
             
             if action == 'subscribe':
                 symbol = data.get('symbol')
-                if symbol:
+                if not self._valid_symbol(symbol):
+                    logger.warning(f"Rejected subscription to invalid symbol: {symbol!r}")
+                    await self._send(websocket, orjson.dumps({
+                        'type': 'error',
+                        'data': 'Invalid symbol'
+                    }))
+                else:
                     self.subscribed_symbols.add(symbol)
+                    self._refresh_symbols()
                     logger.info(f"Client subscribed to {symbol}")
                     
                     # Send immediate price update
-                    symbol_info = self.get_symbol_info(symbol)
+                    symbol_info = await self._mt5_call(self.get_symbol_info, symbol)
                     if symbol_info:
                         response = {
                             'type': 'price',
                             'data': symbol_info
                         }
-                        await websocket.send(json.dumps(response))
+                        await self._send(websocket, orjson.dumps(response))
             
             elif action == 'unsubscribe':
                 symbol = data.get('symbol')
                 if symbol in self.subscribed_symbols:
                     self.subscribed_symbols.remove(symbol)
+                    self._refresh_symbols()
                     logger.info(f"Client unsubscribed from {symbol}")
             
             elif action == 'trade':
                 result = await self.execute_trade(data)
-                await websocket.send(json.dumps({
+                await self._send(websocket, orjson.dumps({
                     'type': 'trade_result',
                     'data': result
                 }))
             
             elif action == 'close':
                 result = await self.close_position(data.get('ticket'))
-                await websocket.send(json.dumps({
+                await self._send(websocket, orjson.dumps({
                     'type': 'close_result',
                     'data': result
                 }))
             
             elif action == 'account_info':
-                account_info = self.get_account_info()
-                await websocket.send(json.dumps({
+                account_info = await self.get_account_info()
+                await self._send(websocket, orjson.dumps({
                     'type': 'account',
                     'data': account_info
                 }))
                 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             logger.error(f"Invalid JSON received: {message}")
         except Exception as e:
             logger.error(f"Error handling client message: {e}")
 
     async def execute_trade(self, trade_data: Dict) -> Dict:
         """Execute trade on MT5"""
+        return await self._mt5_call(self._execute_trade, trade_data)
+
+    def _execute_trade(self, trade_data: Dict) -> Dict:
+        """Send a market order; runs on the MT5 executor"""
         try:
             symbol = trade_data.get('symbol')
             trade_type = trade_data.get('type')  # 'buy' or 'sell'
@@ -226,7 +380,7 @@ class MT5Bridge:
             comment = trade_data.get('comment', 'ARIA V3 Elite Trade')
             
             # Convert trade type
-            order_type = mt5.ORDER_TYPE_BUY if trade_type == 'buy' else mt5.ORDER_TYPE_SELL
+            order_type = _BUY if trade_type == 'buy' else _SELL
             
             # Get current price if not provided
             if not price:
@@ -235,7 +389,7 @@ class MT5Bridge:
             
             # Prepare trade request
             request = {
-                "action": mt5.TRADE_ACTION_DEAL,
+                "action": _DEAL,
                 "symbol": symbol,
                 "volume": volume,
                 "type": order_type,
@@ -243,14 +397,14 @@ class MT5Bridge:
                 "sl": sl,
                 "tp": tp,
                 "comment": comment,
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_IOC
+                "type_time": _GTC,
+                "type_filling": _IOC
             }
             
             # Send trade request
             result = mt5.order_send(request)
             
-            if result.retcode != mt5.TRADE_RETCODE_DONE:
+            if result.retcode != _DONE:
                 logger.error(f"Trade failed: {result.retcode} - {result.comment}")
                 return {
                     'success': False,
@@ -278,6 +432,10 @@ class MT5Bridge:
 
     async def close_position(self, ticket: int) -> Dict:
         """Close position by ticket"""
+        return await self._mt5_call(self._close_position, ticket)
+
+    def _close_position(self, ticket: int) -> Dict:
+        """Close a position with an opposite deal; runs on the MT5 executor"""
         try:
             positions = mt5.positions_get(ticket=ticket)
             if not positions:
@@ -286,22 +444,22 @@ class MT5Bridge:
             position = positions[0]
             
             # Prepare close request
-            close_type = mt5.ORDER_TYPE_SELL if position.type == mt5.ORDER_TYPE_BUY else mt5.ORDER_TYPE_BUY
+            close_type = _SELL if position.type == _BUY else _BUY
             
             request = {
-                "action": mt5.TRADE_ACTION_DEAL,
+                "action": _DEAL,
                 "symbol": position.symbol,
                 "volume": position.volume,
                 "type": close_type,
                 "position": ticket,
                 "comment": "ARIA V3 Elite Close",
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_IOC
+                "type_time": _GTC,
+                "type_filling": _IOC
             }
             
             result = mt5.order_send(request)
             
-            if result.retcode != mt5.TRADE_RETCODE_DONE:
+            if result.retcode != _DONE:
                 return {
                     'success': False,
                     'error': f"Close failed: {result.comment}",
@@ -320,8 +478,32 @@ class MT5Bridge:
             logger.error(f"Position close error: {e}")
             return {'success': False, 'error': str(e)}
 
-    def get_account_info(self) -> Dict:
-        """Get account information"""
+    async def get_account_info(self) -> Dict:
+        """Get account information, cached for ACCOUNT_CACHE_TTL seconds"""
+        cached_at, account = self._account_cache
+        if time.monotonic() - cached_at < ACCOUNT_CACHE_TTL:
+            return account
+        
+        async with self._account_lock:
+            # Another caller may have refreshed while we waited for the lock
+            cached_at, account = self._account_cache
+            if time.monotonic() - cached_at < ACCOUNT_CACHE_TTL:
+                return account
+            
+            account = await self._mt5_call(self._fetch_account_info)
+            self._account_cache = (time.monotonic(), account)
+            self._connected_bytes = orjson.dumps({
+                'type': 'connected',
+                'data': {
+                    'message': 'Connected to ARIA MT5 Bridge',
+                    'mt5_connected': self.mt5_connected,
+                    'account': account
+                }
+            })
+            return account
+
+    def _fetch_account_info(self) -> Dict:
+        """Query MT5 for account information; runs on the MT5 executor"""
         try:
             account_info = mt5.account_info()
             if account_info is None:
@@ -342,23 +524,78 @@ class MT5Bridge:
             logger.error(f"Error getting account info: {e}")
             return {}
 
+    async def _send(self, websocket, payload: bytes):
+        """Send a payload, compressing it for clients on the zlib subprotocol"""
+        if websocket.subprotocol == ZLIB_SUBPROTOCOL:
+            payload = zlib.compress(payload, 1)
+        await websocket.send(payload)
+
+    def _add_client(self, websocket):
+        """Register a connected client"""
+        if id(websocket) not in self._client_index:
+            self._client_index[id(websocket)] = len(self.connected_clients)
+            self.connected_clients.append(websocket)
+            self._update_has_work()
+
+    def _remove_client(self, websocket):
+        """Unregister a client by moving the last entry into its slot"""
+        index = self._client_index.pop(id(websocket), None)
+        if index is None:
+            return
+        clients = self.connected_clients
+        last = clients.pop()
+        if index < len(clients):
+            clients[index] = last
+            self._client_index[id(last)] = index
+        self._update_has_work()
+
     async def handle_client(self, websocket, path):
         """Handle WebSocket client connection"""
         logger.info(f"New client connected from {websocket.remote_address}")
-        self.connected_clients.add(websocket)
+        if len(self.connected_clients) >= self.max_clients:
+            logger.warning(f"Rejecting client {websocket.remote_address} - {self.max_clients} clients already connected")
+            await websocket.close(1013, "busy")
+            return
+        self._add_client(websocket)
         
         try:
             # Send connection confirmation
-            await websocket.send(json.dumps({
-                'type': 'connected',
-                'data': {
-                    'message': 'Connected to ARIA MT5 Bridge',
-                    'mt5_connected': self.mt5_connected,
-                    'account': self.get_account_info() if self.mt5_connected else {}
-                }
-            }))
+            if self.mt5_connected:
+                # Refreshes the pre-serialized handshake only when it is stale
+                await self.get_account_info()
+                await self._send(websocket, self._connected_bytes)
+            else:
+                await self._send(websocket, orjson.dumps({
+                    'type': 'connected',
+                    'data': {
+                        'message': 'Connected to ARIA MT5 Bridge',
+                        'mt5_connected': False,
+                        'account': {}
+                    }
+                }))
             
+            tokens = CLIENT_MESSAGE_BURST
+            last = time.monotonic()
+            throttled = False
             async for message in websocket:
+                # Refill the bucket and drop messages arriving faster than the rate
+                now = time.monotonic()
+                tokens = min(CLIENT_MESSAGE_BURST, tokens + (now - last) * CLIENT_MESSAGE_RATE)
+                last = now
+                if tokens < 1.0:
+                    if not throttled:
+                        logger.warning(f"Rate limit exceeded - dropping messages from {websocket.remote_address}")
+                        throttled = True
+                    # Never drop silently: callers (trade/close in particular) must learn
+                    # their request was not executed
+                    await self._send(websocket, orjson.dumps({
+                        'type': 'error',
+                        'data': 'Rate limit exceeded'
+                    }))
+                    continue
+                tokens -= 1.0
+                throttled = False
+                
                 await self.handle_client_message(websocket, message)
                 
         except websockets.exceptions.ConnectionClosed:
@@ -366,7 +603,7 @@ class MT5Bridge:
         except Exception as e:
             logger.error(f"Client handler error: {e}")
         finally:
-            self.connected_clients.discard(websocket)
+            self._remove_client(websocket)
 
     async def start_server(self):
         """Start WebSocket server"""
@@ -379,14 +616,25 @@ class MT5Bridge:
         
         self.running = True
         
+        # Compile pack_ticks now rather than on the first price tick
+        pack_ticks(np.zeros(1), np.zeros(1), np.zeros(1), np.zeros(1, dtype=np.int64))
+        
         # Start price feed worker
         asyncio.create_task(self.price_feed_worker())
         
         # Start WebSocket server
+        # Every client receives identical price frames, so per-connection
+        # permessage-deflate would only add zlib CPU and memory per socket;
+        # clients wanting compression negotiate ZLIB_SUBPROTOCOL instead
         server = await websockets.serve(
             self.handle_client,
             "localhost",
-            self.websocket_port
+            self.websocket_port,
+            compression=None,
+            subprotocols=[ZLIB_SUBPROTOCOL],
+            max_queue=32,
+            ping_interval=20,
+            ping_timeout=20
         )
         
         logger.info(f"MT5 Bridge server running on ws://localhost:{self.websocket_port}")
@@ -397,12 +645,27 @@ class MT5Bridge:
             logger.info("Shutting down MT5 Bridge...")
         finally:
             self.running = False
-            mt5.shutdown()
+            await self._mt5_call(mt5.shutdown)
+            self._mt5_executor.shutdown(wait=True)
 
 async def main():
     """Main entry point"""
     bridge = MT5Bridge()
     await bridge.start_server()
 
+def install_event_loop():
+    """Use uvloop (winloop on Windows) when available, else stock asyncio"""
+    try:
+        if os.name == 'nt':
+            import winloop as fast_loop
+        else:
+            import uvloop as fast_loop
+    except ImportError:
+        logger.info("uvloop/winloop not installed - using default asyncio event loop")
+        return
+    asyncio.set_event_loop_policy(fast_loop.EventLoopPolicy())
+    logger.info(f"Using {fast_loop.__name__} event loop")
+
 if __name__ == "__main__":
+    install_event_loop()
     asyncio.run(main())
@@ -1,6 +1,10 @@
 import WebSocket from 'ws';
+import { inflateSync } from 'zlib';
 import { logger } from './logger';
 
+// Bridge subprotocol where every frame is a zlib-compressed JSON message
+const ZLIB_SUBPROTOCOL = 'aria-zlib-1';
+
 interface MT5Price {
   symbol: string;
   bid: number;
@@ -31,11 +35,11 @@ export class MT5Connector {
   private isConnected = false;
   private subscriptions = new Set<string>();
 
-  constructor(private wsUrl: string) {}
+  constructor(private wsUrl: string, private compress = false) {}
 
   async connect(): Promise<boolean> {
     try {
-      this.ws = new WebSocket(this.wsUrl);
+      this.ws = new WebSocket(this.wsUrl, this.compress ? [ZLIB_SUBPROTOCOL] : []);
 
       this.ws.on('open', () => {
         logger.info('MT5 WebSocket connected', { url: this.wsUrl });
@@ -48,7 +52,8 @@ export class MT5Connector {
 
       this.ws.on('message', (data: Buffer) => {
         try {
-          const message = JSON.parse(data.toString());
+          const payload = this.ws?.protocol === ZLIB_SUBPROTOCOL ? inflateSync(data) : data;
+          const message = JSON.parse(payload.toString());
           this.handleMessage(message);
         } catch (error) {
           logger.error('Failed to parse MT5 message', { error, data: data.toString() });
@@ -108,6 +113,10 @@ export class MT5Connector {
         // Handle new format from Python bridge
         this.handleMarketDataUpdate(message);
         break;
+      case 'market_data_batch':
+        // One frame per tick carrying all subscribed symbols
+        this.handleMarketDataBatch(message);
+        break;
       case 'trade':
         this.handleTradeUpdate(message.data);
         break;
@@ -137,6 +146,39 @@ export class MT5Connector {
     this.emit('market_data', message);
   }
 
+  private handleMarketDataBatch(message: any): void {
+    // Columnar batch: prices[i] holds the values named by fields for symbols[i]
+    const fields: string[] = message.fields || [];
+    const prices: number[][] = message.prices || [];
+    // Bridge sends epoch milliseconds; consumers expect an ISO string
+    const timestamp = new Date(message.timestamp).toISOString();
+
+    (message.symbols || []).forEach((symbol: string, i: number) => {
+      const tick: Record<string, number> = {};
+      fields.forEach((field, j) => {
+        tick[field] = prices[i][j];
+      });
+
+      this.emit('market_data', {
+        type: 'market_data',
+        symbol,
+        timestamp,
+        open: tick.bid,
+        high: tick.ask,
+        low: tick.bid,
+        close: tick.bid,
+        volume: 1000,
+        bid: tick.bid,
+        ask: tick.ask,
+        spread: tick.spread,
+        bidSize: 1000,
+        askSize: 1000,
+        change24h: 0,
+        changePercent24h: 0
+      });
+    });
+  }
+
   private handleTradeUpdate(trade: MT5Trade): void {
     logger.info('MT5 trade update', { ticket: trade.ticket, symbol: trade.symbol });
     this.emit('trade_update', trade);
@@ -273,5 +315,6 @@ export class MT5Connector {
 
 // Singleton instance
 export const mt5Connector = new MT5Connector(
-  process.env.MT5_WEBSOCKET_URL || 'ws://localhost:8000/ws'
+  process.env.MT5_WEBSOCKET_URL || 'ws://localhost:8000/ws',
+  process.env.MT5_WEBSOCKET_COMPRESSION === 'zlib'
 );
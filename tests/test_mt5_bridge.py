@@ -0,0 +1,76 @@
+"""Golden-parser checks for the hand-rolled market_data_batch encoder"""
+
+import os
+import sys
+import types
+
+import numpy as np
+import orjson
+
+# MetaTrader5 only ships for Windows; stub the constants read at import time
+_mt5_stub = types.ModuleType('MetaTrader5')
+_mt5_stub.TRADE_ACTION_DEAL = 1
+_mt5_stub.ORDER_TYPE_BUY = 0
+_mt5_stub.ORDER_TYPE_SELL = 1
+_mt5_stub.ORDER_TIME_GTC = 0
+_mt5_stub.ORDER_FILLING_IOC = 1
+_mt5_stub.TRADE_RETCODE_DONE = 10009
+sys.modules.setdefault('MetaTrader5', _mt5_stub)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mt5_bridge  # noqa: E402
+from mt5_bridge import PRICE_FIELDS, pack_ticks  # noqa: E402
+
+
+def _pack(bids, asks, spreads, digits):
+    return pack_ticks(
+        np.array(bids, dtype=np.float64),
+        np.array(asks, dtype=np.float64),
+        np.array(spreads, dtype=np.float64),
+        np.array(digits, dtype=np.int64)
+    )
+
+
+def test_encode_batch_matches_golden_schema():
+    bridge = mt5_bridge.MT5Bridge()
+    names = ['EURUSD', 'US30"cash', 'GER40\\m', 'DAXé\n']
+    prices = _pack(
+        [1.085234, 39000.5, 18000.25, 15000.0],
+        [1.08535, 39001.5, 18001.0, 15001.0],
+        [12, 10, 75, 100],
+        [5, 1, 2, 2]
+    )
+
+    frame = bridge._encode_batch(1792062366464, names, prices)
+
+    assert orjson.loads(frame) == {
+        'type': 'market_data_batch',
+        'timestamp': 1792062366464,
+        'symbols': names,
+        'fields': list(PRICE_FIELDS),
+        'prices': [
+            [1.08523, 1.08535, 0.00012],
+            [39000.5, 39001.5, 1.0],
+            [18000.25, 18001.0, 0.75],
+            [15000.0, 15001.0, 1.0]
+        ]
+    }
+
+
+def test_encode_batch_refreshes_cached_symbols():
+    bridge = mt5_bridge.MT5Bridge()
+    first = bridge._encode_batch(1, ['EURUSD'], _pack([1.1], [1.2], [10], [5]))
+    second = bridge._encode_batch(2, ['EURUSD', 'USDJPY'], _pack([1.1, 150.1], [1.2, 150.2], [10, 10], [5, 3]))
+    third = bridge._encode_batch(3, ['USDJPY'], _pack([150.3], [150.4], [10], [3]))
+
+    assert orjson.loads(first)['symbols'] == ['EURUSD']
+    assert orjson.loads(second)['symbols'] == ['EURUSD', 'USDJPY']
+    assert orjson.loads(second)['prices'] == [[1.1, 1.2, 0.0001], [150.1, 150.2, 0.01]]
+    assert orjson.loads(third) == {
+        'type': 'market_data_batch',
+        'timestamp': 3,
+        'symbols': ['USDJPY'],
+        'fields': list(PRICE_FIELDS),
+        'prices': [[150.3, 150.4, 0.01]]
+    }